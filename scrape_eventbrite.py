@@ -2,18 +2,28 @@
 """
 Scrape Eventbrite for veteran events in Montana and Wyoming over the next 60 days.
 This script uses the Eventbrite API and writes a JSON file with a list of events or an error message.
+A successful payload lists its metadata, then `events`, then `count` and `warnings`, so it can be streamed.
 """
 
-import json
+import asyncio
+import hashlib
+import math
 import os
+import random
+import re
 import sys
+import tempfile
 import time
-from typing import Dict, List, Tuple
+from functools import lru_cache
+from itertools import chain
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-import requests
+import httpx
+import orjson
 from datetime import datetime, timedelta
 
 API_BASE = "https://www.eventbriteapi.com/v3"
+SEARCH_URL = f"{API_BASE}/events/search"
 OUT_FILE = "events.json"
 
 # Default configuration
@@ -24,13 +34,89 @@ DEFAULT_QUERY = os.environ.get(
 )
 DEFAULT_WITHIN = os.environ.get("EVENTBRITE_WITHIN", "500mi")
 LOOKAHEAD_DAYS = int(os.environ.get("EVENTBRITE_DAYS", "60"))
-PAGE_DELAY_SEC = float(os.environ.get("EVENTBRITE_PAGE_DELAY_SEC", "0.5"))
+MAX_CONCURRENCY = int(os.environ.get("EVENTBRITE_MAX_CONCURRENCY", "4"))
+MAX_CONNECTIONS = int(os.environ.get("EVENTBRITE_MAX_CONNECTIONS", "8"))
+MAX_RETRIES = int(os.environ.get("EVENTBRITE_MAX_RETRIES", "5"))
+RETRY_BACKOFF_SEC = float(os.environ.get("EVENTBRITE_RETRY_BACKOFF_SEC", "0.3"))
+RETRY_MAX_SEC = float(os.environ.get("EVENTBRITE_RETRY_MAX_SEC", "30"))
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+CACHE_DIR = os.environ.get("EVENTBRITE_CACHE_DIR", os.path.join(".cache", "eventbrite"))
+CACHE_TTL_SEC = float(os.environ.get("EVENTBRITE_CACHE_TTL_SEC", "300"))
+PARALLEL_TERMS = os.environ.get("EVENTBRITE_PARALLEL_TERMS") == "1"
+DEBUG = os.environ.get("EVENTBRITE_DEBUG") == "1"
+PRETTY_JSON = os.environ.get("EVENTBRITE_PRETTY") == "1"
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if PRETTY_JSON else 0)
+# Streamed output is always compact; indentation cannot be spliced per element
+STREAM_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _open_temp(path: str) -> Tuple[str, BinaryIO]:
+    """Open a temp file next to `path` for writing its replacement."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    return tmp, os.fdopen(fd, "wb")
+
+
+def _publish_temp(tmp: str, path: str) -> None:
+    """Atomically move a finished temp file over `path`."""
+    # mkstemp creates files owner-only; match a normally written file
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, path)
 
 
 def save_json(payload: Dict, path: str = OUT_FILE) -> None:
-    """Save a payload as JSON to the given path."""
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
+    """Atomically save a payload as compact UTF-8 JSON to the given path (indented if PRETTY_JSON)."""
+    tmp, f = _open_temp(path)
+    try:
+        with f:
+            f.write(orjson.dumps(payload, option=JSON_OPTIONS))
+        _publish_temp(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class JsonArrayWriter:
+    """Stream a JSON object whose `key` array is written one element at a time.
+
+    `head` fields are written before the array. On a clean exit the array is
+    closed, followed by `count` and any fields placed in `tail`, and the file
+    atomically replaces `path`; on error the previous file is left untouched.
+    Output is always compact, regardless of PRETTY_JSON.
+    """
+
+    def __init__(self, path: str, head: Dict, key: str) -> None:
+        self.path = path
+        self.head = head
+        self.key = key
+        self.tail: Dict = {}
+        self.count = 0
+
+    def __enter__(self) -> "JsonArrayWriter":
+        self._tmp, self._file = _open_temp(self.path)
+        prefix = orjson.dumps(self.head, option=STREAM_JSON_OPTIONS)[:-1]
+        if self.head:
+            prefix += b","
+        self._file.write(prefix + orjson.dumps(self.key) + b":[")
+        return self
+
+    def write(self, obj: Dict) -> None:
+        """Append one element to the array."""
+        if self.count:
+            self._file.write(b",")
+        self._file.write(orjson.dumps(obj, option=STREAM_JSON_OPTIONS))
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            if exc_type is None:
+                tail = orjson.dumps({"count": self.count, **self.tail}, option=STREAM_JSON_OPTIONS)
+                self._file.write(b"]," + tail[1:])
+            self._file.close()
+            if exc_type is None:
+                _publish_temp(self._tmp, self.path)
+        finally:
+            if os.path.exists(self._tmp):
+                os.remove(self._tmp)
 
 
 def get_token() -> str:
@@ -42,147 +128,340 @@ def get_token() -> str:
     return token
 
 
-def search_region(
-    session: requests.Session,
-    headers: Dict[str, str],
+_CACHE_TMP_PREFIX = "eventbrite-"
+# Names written by write_cache: <sha1>.json entries and mkstemp temp files
+_CACHE_FILE = re.compile(r"[0-9a-f]{40}\.json|" + re.escape(_CACHE_TMP_PREFIX) + r"\w+\.tmp")
+
+
+def _cache_path(url: str, params: Dict) -> str:
+    """Return the cache file path for a search."""
+    key = hashlib.sha1(orjson.dumps([url, params], option=orjson.OPT_SORT_KEYS)).hexdigest()
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+
+def read_cache(url: str, params: Dict) -> Optional[Dict]:
+    """Return cached search data if present and not expired."""
+    if CACHE_TTL_SEC <= 0:
+        return None
+    path = _cache_path(url, params)
+    try:
+        if os.path.getmtime(path) < time.time() - CACHE_TTL_SEC:
+            return None
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    except (OSError, orjson.JSONDecodeError):
+        return None
+
+
+def prune_cache() -> None:
+    """Delete this cache's own entries and leftover temp files older than the TTL."""
+    expired = time.time() - CACHE_TTL_SEC
+    try:
+        entries = os.scandir(CACHE_DIR)
+    except OSError:
+        return
+    with entries:
+        for entry in entries:
+            # Never touch files the cache did not create
+            if not _CACHE_FILE.fullmatch(entry.name):
+                continue
+            try:
+                if entry.stat().st_mtime < expired:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+
+def write_cache(url: str, params: Dict, body: bytes) -> None:
+    """Store serialized search data in the cache, replacing any previous entry atomically."""
+    if CACHE_TTL_SEC <= 0:
+        return
+    prune_cache()
+    tmp = None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, prefix=_CACHE_TMP_PREFIX, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp, _cache_path(url, params))
+    except OSError:
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+@lru_cache(maxsize=None)
+def _headers(token: str) -> Dict[str, str]:
+    """Build request headers once per token."""
+    return {
+        "Authorization": f"Bearer {token}",
+        "Accept": "application/json",
+        "User-Agent": os.environ.get("VNN_USER_AGENT", "mt-wy-veteran-scraper/1.0"),
+    }
+
+
+def retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """Return seconds to wait before retry `attempt`, honoring Retry-After, capped at RETRY_MAX_SEC."""
+    delay = RETRY_BACKOFF_SEC * (2 ** attempt) * (0.5 + random.random())
+    if retry_after:
+        try:
+            requested = float(retry_after)
+        except ValueError:
+            requested = math.nan
+        if math.isfinite(requested):
+            delay = requested
+    return min(max(delay, 0.0), RETRY_MAX_SEC)
+
+
+async def read_snippet(resp: httpx.Response, limit: int = 256) -> str:
+    """Read at most `limit` bytes of a streamed response body for a warning, then close it."""
+    chunks: List[bytes] = []
+    size = 0
+    try:
+        async for chunk in resp.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= limit:
+                break
+    finally:
+        await resp.aclose()
+    return b"".join(chunks)[:limit].decode("utf-8", "replace")
+
+
+async def fetch_page(
+    session: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    location_address: str,
+    params: Dict,
+) -> Tuple[Dict, str]:
+    """Fetch a single search page and return its data or a warning."""
+    request = session.build_request("GET", SEARCH_URL, params=params)
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with semaphore:
+                resp = await session.send(request, stream=True)
+                if resp.status_code == 200:
+                    try:
+                        body = await resp.aread()
+                    finally:
+                        await resp.aclose()
+                    break
+                snippet = await read_snippet(resp)
+        except httpx.TransportError as exc:
+            if attempt == MAX_RETRIES:
+                return {}, f"request_error:{location_address}:{exc}"
+            await asyncio.sleep(retry_delay(attempt))
+            continue
+        except httpx.HTTPError as exc:
+            return {}, f"request_error:{location_address}:{exc}"
+        if resp.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            if resp.status_code == 404:
+                return {}, f"404:{location_address}:{snippet}"
+            return {}, f"http_{resp.status_code}:{location_address}:{snippet}"
+        await asyncio.sleep(retry_delay(attempt, resp.headers.get("Retry-After")))
+    return orjson.loads(body), ""
+
+
+async def search_region(
+    session: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
     query: str,
     location_address: str,
     within: str,
 ) -> Tuple[List[Dict], List[str]]:
     """Search a single region and return events and warnings."""
+    # Day-aligned bounds keep cache keys stable; iter_upcoming trims the edges
+    today = datetime.utcnow().date()
     params = {
         "q": query,
         "location.address": location_address,
         "location.within": within,
+        "start_date.range_start": f"{today.isoformat()}T00:00:00Z",
+        "start_date.range_end": f"{(today + timedelta(days=LOOKAHEAD_DAYS + 1)).isoformat()}T00:00:00Z",
         "expand": "venue",
         "sort_by": "date",
-        "page": 1,
     }
+    # Cache whole regions so page_count and every page come from the same snapshot
+    cached = read_cache(SEARCH_URL, params)
+    if cached is not None:
+        return cached.get("events", []), []
     results: List[Dict] = []
     warnings: List[str] = []
-    while True:
-        url = f"{API_BASE}/events/search"
-        try:
-            resp = session.get(url, headers=headers, params=params, timeout=30)
-        except requests.RequestException as exc:
-            warnings.append(f"request_error:{location_address}:{exc}")
-            break
-        if resp.status_code == 404:
-            warnings.append(f"404:{location_address}:{resp.text[:256]}")
-            break
-        if resp.status_code != 200:
-            warnings.append(f"http_{resp.status_code}:{location_address}:{resp.text[:256]}")
-            break
-        data = resp.json()
+    data, warning = await fetch_page(session, semaphore, location_address, {**params, "page": 1})
+    if warning:
+        return results, [warning]
+    results.extend(data.get("events", []) or [])
+    # The first page reports the total, so fetch the rest concurrently
+    page_count = data.get("pagination", {}).get("page_count") or 1
+    pages = await asyncio.gather(
+        *(
+            fetch_page(session, semaphore, location_address, {**params, "page": page})
+            for page in range(2, page_count + 1)
+        )
+    )
+    for data, warning in pages:
+        if warning:
+            warnings.append(warning)
+            continue
         results.extend(data.get("events", []) or [])
-        if not data.get("pagination", {}).get("has_more_items"):
-            break
-        params["page"] += 1
-        time.sleep(PAGE_DELAY_SEC)
+    if not warnings:
+        write_cache(SEARCH_URL, params, orjson.dumps({"events": results}))
     return results, warnings
 
 
-def normalize_events(events: List[Dict]) -> List[Dict]:
-    """Normalize raw Eventbrite events into a simplified structure."""
-    normalized: List[Dict] = []
-    for e in events:
-        venue = e.get("venue") or {}
-        address = venue.get("address") or {}
-        normalized.append({
-            "id": e.get("id"),
-            "name": (e.get("name") or {}).get("text"),
-            "url": e.get("url"),
-            "start": (e.get("start") or {}).get("local"),
-            "end": (e.get("end") or {}).get("local"),
-            "is_free": e.get("is_free"),
-            "status": e.get("status"),
-            "city": address.get("city"),
-            "state": address.get("region"),
-            "venue_name": venue.get("name"),
-            "address": address.get("localized_address_display"),
-        })
-    return normalized
-
-
-def filter_upcoming(events: List[Dict], days: int = LOOKAHEAD_DAYS) -> List[Dict]:
-    """Filter events to those starting within the next `days` days."""
-    now = datetime.utcnow()
-    cutoff = now + timedelta(days=days)
-    filtered: List[Dict] = []
+def normalize_event(e: Dict) -> Dict:
+    """Normalize a raw Eventbrite event into a simplified structure."""
+    get = e.get
+    name = get("name")
+    start = get("start")
+    end = get("end")
+    venue = get("venue") or {}
+    address = venue.get("address") or {}
+    return {
+        "id": get("id"),
+        "name": name.get("text") if name else None,
+        "url": get("url"),
+        "start": start.get("local") if start else None,
+        "end": end.get("local") if end else None,
+        "is_free": get("is_free"),
+        "status": get("status"),
+        "city": address.get("city"),
+        "state": address.get("region"),
+        "venue_name": venue.get("name"),
+        "address": address.get("localized_address_display"),
+    }
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO-8601 timestamp, memoized since recurring events share start times."""
+    return datetime.fromisoformat(value)
+
+
+def iter_upcoming(
+    events: Iterable[Dict],
+    now: datetime,
+    cutoff: datetime,
+    seen: Set[str],
+) -> Iterator[Dict]:
+    """Normalize raw events in one pass, yielding unseen ones starting between now and cutoff."""
     for e in events:
-        start = e.get("start")
+        norm = normalize_event(e)
+        start = norm["start"]
         if not start:
             continue
         try:
-            dt = datetime.fromisoformat(start)
+            dt = _parse_iso(start)
         except ValueError:
             continue
-        if now <= dt <= cutoff:
-            filtered.append(e)
-    return filtered
+        if not now <= dt <= cutoff:
+            continue
+        # Deduplicate by the globally unique event id
+        event_id = norm["id"]
+        if event_id is None or event_id in seen:
+            continue
+        seen.add(event_id)
+        yield norm
 
 
-def fetch_events(token: str, query: str = DEFAULT_QUERY, states: List[str] = None, within: str = DEFAULT_WITHIN) -> Dict:
-    """Fetch and process events across multiple states."""
-    if states is None:
-        states = DEFAULT_STATES
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-        "User-Agent": os.environ.get("VNN_USER_AGENT", "mt-wy-veteran-scraper/1.0"),
-    }
-    session = requests.Session()
-    all_raw: List[Dict] = []
-    all_warnings: List[str] = []
-    for state in states:
-        events, warns = search_region(session, headers, query, state, within)
-        all_raw.extend(events)
-        all_warnings.extend(warns)
-    normalized = normalize_events(all_raw)
-    upcoming = filter_upcoming(normalized, LOOKAHEAD_DAYS)
-    # Deduplicate by (name, start)
-    seen = set()
-    unique: List[Dict] = []
-    for e in upcoming:
-        key = (e.get("name"), e.get("start"))
-        if key in seen:
-            continue
-        seen.add(key)
-        unique.append(e)
+async def search_all(
+    token: str,
+    query: str,
+    states: List[str],
+    within: str,
+) -> Tuple[Iterator[Dict], List[str]]:
+    """Search every region and return a lazy stream of upcoming unique events and warnings."""
+    headers = _headers(token)
+    # Optionally run one search per OR term instead of one combined query
+    terms = query.split(" OR ") if PARALLEL_TERMS else [query]
+    # Bound in-flight requests across all regions
+    semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    # One HTTP/2 connection multiplexes every region and page
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS)
+    # Follow redirects like the requests client did; httpx defaults to not following
+    async with httpx.AsyncClient(
+        http2=True,
+        timeout=30,
+        headers=headers,
+        limits=limits,
+        follow_redirects=True,
+    ) as session:
+        results = await asyncio.gather(
+            *(
+                search_region(session, semaphore, term, state, within)
+                for term in terms
+                for state in states
+            )
+        )
+    all_raw = chain.from_iterable(events for events, _ in results)
+    all_warnings = [w for _, warns in results for w in warns]
+    now = datetime.utcnow()
+    cutoff = now + timedelta(days=LOOKAHEAD_DAYS)
+    return iter_upcoming(all_raw, now, cutoff, set()), all_warnings
+
+
+def payload_head(query: str, states: List[str], within: str) -> Dict:
+    """Return the metadata fields that precede the events in a successful payload."""
     return {
         "generated": True,
         "source": "eventbrite",
         "query": query,
         "regions": states,
         "within": within,
-        "count": len(unique),
+    }
+
+
+async def fetch_events(token: str, query: str = DEFAULT_QUERY, states: List[str] = None, within: str = DEFAULT_WITHIN) -> Dict:
+    """Fetch and process events across multiple states."""
+    if states is None:
+        states = DEFAULT_STATES
+    events, warnings = await search_all(token, query, states, within)
+    unique = list(events)
+    return {
+        **payload_head(query, states, within),
         "events": unique,
-        "warnings": all_warnings,
+        "count": len(unique),
+        "warnings": warnings,
     }
 
 
-def main() -> int:
-    token = get_token()
-    try:
-        payload = fetch_events(token)
-        save_json(payload)
-        return 0
-    except Exception as exc:
-        save_json({"generated": False, "error": str(exc)})
-        return 1
+async def write_events(token: str, path: str = OUT_FILE, query: str = DEFAULT_QUERY, states: List[str] = None, within: str = DEFAULT_WITHIN) -> int:
+    """Fetch events across multiple states and stream them to `path`, returning the count."""
+    if states is None:
+        states = DEFAULT_STATES
+    if PRETTY_JSON:
+        # Indented output needs the whole document, so skip streaming
+        payload = await fetch_events(token, query, states, within)
+        save_json(payload, path)
+        return payload["count"]
+    events, warnings = await search_all(token, query, states, within)
+    with JsonArrayWriter(path, payload_head(query, states, within), "events") as writer:
+        for e in events:
+            writer.write(e)
+        writer.tail["warnings"] = warnings
+    return writer.count
+
+
+def debug(message: str) -> None:
+    """Print a diagnostic message when EVENTBRITE_DEBUG=1."""
+    if DEBUG:
+        print(message)
+
 
 def main() -> int:
     token = get_token()
     try:
-        print("Token acquired, starting fetch_events...")  # Debug
-        payload = fetch_events(token)
-        print(f"Fetched {payload['count']} events.")  # Debug
-        save_json(payload)
+        debug("Token acquired, starting write_events...")
+        count = asyncio.run(write_events(token))
+        debug(f"Fetched {count} events.")
         return 0
     except Exception as exc:
         save_json({"generated": False, "error": str(exc)})
-        print(f"Error: {exc}")  # Debug
+        print(f"Error: {exc}", file=sys.stderr)
         return 1
 
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+import httpx
+
+import scrape_eventbrite
+
+
+def raw_event(event_id, start, name="Veterans Breakfast"):
+    return {
+        "id": event_id,
+        "name": {"text": name},
+        "url": f"https://www.eventbrite.com/e/{event_id}",
+        "start": {"local": start},
+        "end": {"local": start},
+        "is_free": True,
+        "status": "live",
+        "venue": {
+            "name": "VFW Post 1116",
+            "address": {"city": "Billings", "region": "MT", "localized_address_display": "Billings, MT"},
+        },
+    }
+
+
+def mock_client(monkeypatch, handler):
+    """Route every AsyncClient created by the scraper through a MockTransport."""
+    real_client = httpx.AsyncClient
+
+    def factory(*args, **kwargs):
+        return real_client(*args, transport=httpx.MockTransport(handler), **kwargs)
+
+    monkeypatch.setattr(scrape_eventbrite.httpx, "AsyncClient", factory)
+    monkeypatch.setattr(scrape_eventbrite, "CACHE_TTL_SEC", 0)
+
+
+def test_iter_upcoming_filters_and_dedupes_by_id():
+    now = datetime(2026, 10, 14, 12, 0)
+    cutoff = now + timedelta(days=60)
+    events = [
+        raw_event("1", "2026-10-14T11:00:00"),
+        raw_event("2", "2026-10-14T13:00:00"),
+        raw_event("3", "2026-11-01T10:00:00"),
+        raw_event("3", "2026-11-01T10:00:00"),
+        raw_event("4", "2026-12-13T13:00:00"),
+        raw_event(None, "2026-11-02T10:00:00"),
+        raw_event("5", "bad"),
+        raw_event("6", "2026-11-01Tgarbage"),
+        raw_event("7", "2026-11-31T10:00:00"),
+    ]
+    result = list(scrape_eventbrite.iter_upcoming(events, now, cutoff, set()))
+    assert [e["id"] for e in result] == ["2", "3"]
+    assert result[1]["city"] == "Billings"
+
+
+def test_write_events_with_mocked_transport(monkeypatch, tmp_path):
+    start = (datetime.utcnow() + timedelta(days=5)).replace(microsecond=0).isoformat()
+    pages = {
+        "1": {"events": [raw_event("1", start), raw_event("2", start)], "pagination": {"page_count": 2}},
+        "2": {"events": [raw_event("3", start)], "pagination": {"page_count": 2}},
+    }
+    requested = []
+
+    def handler(request):
+        params = request.url.params
+        requested.append((params["location.address"], params["page"]))
+        assert request.headers["Authorization"] == "Bearer token"
+        if params["location.address"] == "Wyoming":
+            return httpx.Response(503, content=b"<html>" + b"x" * 1000)
+        return httpx.Response(200, json=pages[params["page"]])
+
+    mock_client(monkeypatch, handler)
+    monkeypatch.setattr(scrape_eventbrite, "RETRY_BACKOFF_SEC", 0)
+    path = tmp_path / "events.json"
+    count = asyncio.run(scrape_eventbrite.write_events("token", str(path)))
+
+    payload = json.loads(path.read_text(encoding="utf-8"))
+    assert count == payload["count"] == 3
+    assert [e["id"] for e in payload["events"]] == ["1", "2", "3"]
+    assert payload["generated"] is True
+    assert payload["regions"] == ["Montana", "Wyoming"]
+    assert payload["warnings"] == ["http_503:Wyoming:<html>" + "x" * 250]
+    assert requested.count(("Wyoming", "1")) == scrape_eventbrite.MAX_RETRIES + 1
+
+
+def test_write_events_pretty_falls_back_to_indented_document(monkeypatch, tmp_path):
+    start = (datetime.utcnow() + timedelta(days=5)).replace(microsecond=0).isoformat()
+
+    def handler(request):
+        return httpx.Response(200, json={"events": [raw_event("1", start)], "pagination": {"page_count": 1}})
+
+    mock_client(monkeypatch, handler)
+    monkeypatch.setattr(scrape_eventbrite, "PRETTY_JSON", True)
+    monkeypatch.setattr(scrape_eventbrite, "JSON_OPTIONS", scrape_eventbrite.JSON_OPTIONS | scrape_eventbrite.orjson.OPT_INDENT_2)
+    path = tmp_path / "events.json"
+    count = asyncio.run(scrape_eventbrite.write_events("token", str(path), states=["Montana"]))
+
+    text = path.read_text(encoding="utf-8")
+    assert count == 1
+    assert text == json.dumps(json.loads(text), indent=2, ensure_ascii=False)
+    assert oct(path.stat().st_mode & 0o777) == "0o644"
+    assert list(tmp_path.iterdir()) == [path]
+
+    # Both output modes produce the same document, key order included
+    monkeypatch.setattr(scrape_eventbrite, "PRETTY_JSON", False)
+    monkeypatch.setattr(scrape_eventbrite, "JSON_OPTIONS", scrape_eventbrite.orjson.OPT_NON_STR_KEYS)
+    streamed = tmp_path / "streamed.json"
+    asyncio.run(scrape_eventbrite.write_events("token", str(streamed), states=["Montana"]))
+    assert list(json.loads(streamed.read_text(encoding="utf-8")).items()) == list(json.loads(text).items())
+
+
+def test_retry_delay_clamps_retry_after(monkeypatch):
+    monkeypatch.setattr(scrape_eventbrite, "RETRY_MAX_SEC", 30.0)
+    monkeypatch.setattr(scrape_eventbrite, "RETRY_BACKOFF_SEC", 0.3)
+    assert scrape_eventbrite.retry_delay(0, "2") == 2.0
+    assert scrape_eventbrite.retry_delay(0, "3600") == 30.0
+    assert scrape_eventbrite.retry_delay(0, "-5") == 0.0
+    for bogus in ("inf", "nan", "Wed, 21 Oct 2026 07:28:00 GMT"):
+        assert 0.15 <= scrape_eventbrite.retry_delay(0, bogus) <= 0.45
+    assert scrape_eventbrite.retry_delay(20) == 30.0
+
+
+def test_region_cache_is_all_or_nothing(monkeypatch, tmp_path):
+    start = (datetime.utcnow() + timedelta(days=5)).replace(microsecond=0).isoformat()
+    fail_page_2 = True
+    requested = []
+
+    def handler(request):
+        page = request.url.params["page"]
+        requested.append(page)
+        if page == "2" and fail_page_2:
+            return httpx.Response(404, content=b"not found")
+        return httpx.Response(200, json={"events": [raw_event(page, start)], "pagination": {"page_count": 2}})
+
+    mock_client(monkeypatch, handler)
+    monkeypatch.setattr(scrape_eventbrite, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(scrape_eventbrite, "CACHE_TTL_SEC", 300)
+
+    def run():
+        payload = asyncio.run(scrape_eventbrite.fetch_events("token", states=["Montana"]))
+        return [e["id"] for e in payload["events"]]
+
+    # A region with a failed page is not cached
+    assert run() == ["1"]
+    assert run() == ["1"]
+    assert requested == ["1", "2", "1", "2"]
+
+    fail_page_2 = False
+    assert run() == ["1", "2"]
+    assert run() == ["1", "2"]
+    assert requested[4:] == ["1", "2"]
+
+    cache_dir = tmp_path / "cache"
+    stale_entry = cache_dir / ("0" * 40 + ".json")
+    stale_tmp = cache_dir / "eventbrite-abc_123.tmp"
+    foreign = [cache_dir / "unrelated_tool_state", cache_dir / "other.tmp", cache_dir / "notes.json"]
+    for path in [stale_entry, stale_tmp, *foreign]:
+        path.write_bytes(b"")
+        os.utime(path, (0, 0))
+    scrape_eventbrite.write_cache(scrape_eventbrite.SEARCH_URL, {"q": "x"}, b"{}")
+    assert not stale_entry.exists()
+    assert not stale_tmp.exists()
+    assert all(path.exists() for path in foreign)
+    assert len(list(cache_dir.glob("*.json"))) == 3
+
+
+def test_search_follows_redirects(monkeypatch):
+    start = (datetime.utcnow() + timedelta(days=5)).replace(microsecond=0).isoformat()
+
+    def handler(request):
+        if not request.url.path.endswith("/"):
+            return httpx.Response(301, headers={"Location": str(request.url.copy_with(path=request.url.path + "/"))})
+        return httpx.Response(200, json={"events": [raw_event("1", start)], "pagination": {"page_count": 1}})
+
+    mock_client(monkeypatch, handler)
+    payload = asyncio.run(scrape_eventbrite.fetch_events("token", states=["Montana"]))
+    assert payload["warnings"] == []
+    assert [e["id"] for e in payload["events"]] == ["1"]
+
+
+def test_main_reports_errors_without_debug(monkeypatch, tmp_path, capsys):
+    async def boom(token, path=scrape_eventbrite.OUT_FILE):
+        raise RuntimeError("search exploded")
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("EVENTBRITE_TOKEN", "token")
+    monkeypatch.setattr(scrape_eventbrite, "DEBUG", False)
+    monkeypatch.setattr(scrape_eventbrite, "write_events", boom)
+    assert scrape_eventbrite.main() == 1
+    assert "Error: search exploded" in capsys.readouterr().err
+    assert json.loads((tmp_path / "events.json").read_text())["error"] == "search exploded"